@@ -5,28 +5,45 @@ DXF Translation Client (English Version)
 ========================================
 Streamlit app for uploading DXF files and monitoring translation jobs
 """
+import atexit
 import base64
 import json
+import os
+import shutil
+import tempfile
+import threading
 import time
-import uuid
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, as_completed, wait
 from pathlib import Path
 from google.oauth2.credentials import Credentials
-from google.auth.transport.requests import Request
 from io import BytesIO
 import re
 from datetime import datetime, timezone, timedelta
 
 import streamlit as st
 from googleapiclient.discovery import build
-from googleapiclient.http import MediaIoBaseUpload, MediaIoBaseDownload
+from googleapiclient.http import MediaIoBaseUpload, MediaIoBaseDownload, build_http
 import socket
 import ssl
-import httplib2
 from google_auth_httplib2 import AuthorizedHttp
 from googleapiclient.errors import HttpError
-import time
 import random
-import ssl
+
+try:
+    from ciso8601 import parse_datetime as _parse_iso_fast
+except ImportError:  # optional C parser; datetime.fromisoformat is the fallback
+    _parse_iso_fast = None
+
+try:
+    import orjson
+except ImportError:  # optional speedup; stdlib json is the fallback
+    orjson = None
+
+try:
+    import firebase_admin
+    from firebase_admin import credentials as fb_credentials, db
+except ImportError:  # RTDB worker presence is optional for this client
+    firebase_admin = None
 
 TRANSIENT_EXC_NAMES = {
     "SSLError",
@@ -75,14 +92,32 @@ def _with_retry(fn, *, tries: int = 5, base_sleep: float = 0.6, max_sleep: float
 # =========================
 DXF_SHARED_FOLDER_ID = "1qhx_xTGdOusxhV0xN2df4Kc8JTfh3zTd"
 
-SUBFOLDERS = ["INBOX", "WORKING", "DONE", "META"]
+SUBFOLDERS = ("INBOX", "WORKING", "DONE", "META")
 MAX_FILE_MB = 200
 MAX_FILE_BYTES = MAX_FILE_MB * 1024 * 1024
+UPLOAD_WORKERS = 8  # cap on concurrent INBOX uploads (Drive allows ~10 writes/s per user)
+HEARTBEAT_WORKERS = 8  # concurrent heartbeat JSON downloads
+META_READ_WORKERS = 8  # concurrent META downloads for the batch table
+META_NAMES_PER_QUERY = 40  # name clauses per files.list query (keeps q short)
+PROGRESS_UPDATE_SEC = 0.1  # min interval between batch progress redraws
+STATUS_CACHE_TTL = 3  # sec; matches the shortest refresh interval
+IDLE_PAUSE_SEC = 600  # stop auto-refresh polling after this long without user input
+TERMINAL_STATUSES = ("done", "error")  # no further worker updates expected
+RESUMABLE_MIN_BYTES = 5 * 1024 * 1024  # smaller files go up as one multipart POST
+UPLOAD_CHUNK_BYTES = 8 * 1024 * 1024  # resumable chunk size (multiple of 256 KiB)
+DOWNLOAD_CHUNK_BYTES = 16 * 1024 * 1024  # single-stream download chunk size
+PARALLEL_DOWNLOAD_MIN_BYTES = 32 * 1024 * 1024  # larger results use concurrent Range GETs
+DOWNLOAD_STREAMS = 4
 
 SEOUL_TZ = timezone(timedelta(hours=9))
 
+# Anything but ASCII letters/digits and "-_." is dropped from Drive filenames.
+_UNSAFE_FILENAME_CHARS = re.compile(r"[^A-Za-z0-9._-]")
+
 SCOPES = ["https://www.googleapis.com/auth/drive"]
 
+WORKERS_PATH = "workers"  # RTDB presence: /workers/{worker_id} = {updated_at, status, ...}
+
 
 # =========================
 # Helpers
@@ -93,29 +128,105 @@ def now_seoul_iso() -> str:
 
 def make_job_id(original_name: str) -> str:
     ts = datetime.now(SEOUL_TZ).strftime("%Y%m%d_%H%M%S")
-    short = uuid.uuid4().hex[:8]
+    short = os.urandom(4).hex()
     # Remove spaces and keep only safe ASCII characters for Drive filenames.
     # Some environments/HTTP stacks are surprisingly fragile with non-ASCII names.
     base = original_name.replace(" ", "")
-    safe = "".join(c for c in base if c.isascii() and (c.isalnum() or c in ("-", "_", ".")))
+    safe = _UNSAFE_FILENAME_CHARS.sub("", base)
     safe = safe[:40] if safe else "file"
     return f"{ts}_{short}_{safe}"
 
 
-def drive_execute(req, retries: int = 5, base_sleep: float = 0.6):
-    """Execute Drive API request with retry logic for network stability"""
+def _retry_after_sec(e: Exception) -> float | None:
+    """Retry-After header (seconds) from a Drive HttpError, if any."""
+    resp = getattr(e, "resp", None)
+    if resp is None:
+        return None
+    try:
+        return float(resp.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+class TokenBucket:
+    """Thread-safe token bucket: acquire() blocks until a token is available."""
+
+    def __init__(self, capacity: float, refill_rate: float):
+        self.capacity = capacity
+        self.refill_rate = refill_rate  # tokens per second
+        self._tokens = capacity
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, n: float = 1.0) -> None:
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.refill_rate)
+                self._last = now
+                if self._tokens >= n:
+                    self._tokens -= n
+                    return
+                wait = (n - self._tokens) / self.refill_rate
+            time.sleep(wait)  # sleep outside the lock so other threads can refill-check
+
+
+@st.cache_resource(show_spinner=False)
+def get_drive_writes() -> TokenBucket:
+    # One bucket per process, shared by every rerun, session and upload thread: they all
+    # write as the same OAuth user, so stay just under Drive's ~10 writes/s per user.
+    return TokenBucket(capacity=10, refill_rate=8.0)
+
+
+RETRYABLE_HTTP_STATUSES = {429, 500, 502, 503, 504}
+# Drive reports per-user quota exhaustion as 403 with one of these reasons
+RATE_LIMIT_REASONS = ("rateLimitExceeded", "userRateLimitExceeded")
+
+
+def _is_retryable_http(e: HttpError) -> bool:
+    status = getattr(e.resp, "status", None)
+    if status in RETRYABLE_HTTP_STATUSES:
+        return True
+    if status == 403:
+        content = e.content.decode("utf-8", "replace") if isinstance(e.content, bytes) else str(e.content)
+        return any(reason in content for reason in RATE_LIMIT_REASONS)
+    return False
+
+
+def drive_execute(req, retries: int = 5, base_sleep: float = 0.6, max_total_sleep: float = 30.0, write: bool = False):
+    """Execute Drive API request with retry logic for network stability.
+
+    Only throttling (429, rate-limit 403) and 5xx responses are retried;
+    other HTTP errors (400/401/403/404) are raised at once. Backoff is
+    jittered so parallel upload workers don't retry in lockstep, honors
+    Retry-After, and gives up once max_total_sleep would be exceeded.
+    write=True draws each attempt from the get_drive_writes() rate limiter.
+    """
     last_err = None
+    slept = 0.0
     for i in range(retries + 1):
+        if write:
+            get_drive_writes().acquire()
         try:
             return req.execute(num_retries=1)
         except (HttpError, OSError, ssl.SSLError, socket.timeout) as e:
             last_err = e
+            if isinstance(e, HttpError) and not _is_retryable_http(e):
+                raise
             if i >= retries:
                 raise
-            time.sleep(base_sleep * (2 ** i))
+            delay = base_sleep * (2 ** i) * random.uniform(0.5, 1.5)
+            retry_after = _retry_after_sec(e)
+            if retry_after is not None:
+                delay = max(delay, retry_after)
+            if slept + delay > max_total_sleep:
+                raise
+            slept += delay
+            time.sleep(delay)
     raise last_err
 
 
+@st.cache_resource(show_spinner=False)  # module-level caches are rebuilt on every rerun
 def load_service_account_info():
     # Base64 method (Streamlit Secrets: SERVICE_ACCOUNT_B64)
     if "SERVICE_ACCOUNT_B64" not in st.secrets:
@@ -131,11 +242,21 @@ def load_service_account_info():
     return info
 
 
-SCOPES = ["https://www.googleapis.com/auth/drive"]
+@st.cache_resource(show_spinner=False)
+def init_rtdb() -> bool:
+    """Initialize Firebase Admin if [rtdb].url is set. Returns False when RTDB is not configured."""
+    if firebase_admin is None or "rtdb" not in st.secrets or "url" not in st.secrets["rtdb"]:
+        return False
+
+    # Avoid double-init on Streamlit reruns
+    if not firebase_admin._apps:
+        cred = fb_credentials.Certificate(load_service_account_info())
+        firebase_admin.initialize_app(cred, {"databaseURL": st.secrets["rtdb"]["url"].rstrip("/")})
+    return True
 
 
 @st.cache_resource(show_spinner=False)
-def get_drive_service():
+def get_drive_credentials():
     s = st.secrets["drive_oauth"]
     creds = Credentials(
         token=None,
@@ -145,13 +266,42 @@ def get_drive_service():
         client_secret=s["client_secret"],
         scopes=SCOPES,
     )
-    creds.refresh(Request())
-
-    # Use AuthorizedHttp with timeout for better stability on Streamlit Cloud
-    authed_http = AuthorizedHttp(creds, http=httplib2.Http(timeout=30))
+    # No eager creds.refresh(): AuthorizedHttp calls before_request() on every
+    # request, which refreshes only when the token is missing or expired.
+    return creds
+
+
+def build_drive_service(creds):
+    # Use AuthorizedHttp with timeout for better stability on Streamlit Cloud.
+    # build_http() (not a bare httplib2.Http) drops 308 from redirect_codes: resumable
+    # uploads answer each chunk with "308 Resume Incomplete" and no Location header.
+    http = build_http()
+    http.timeout = 30
+    authed_http = AuthorizedHttp(creds, http=http)
     return build("drive", "v3", http=authed_http, cache_discovery=False)
 
 
+@st.cache_resource(show_spinner=False)
+def get_drive_service():
+    return build_drive_service(get_drive_credentials())
+
+
+_thread_local = threading.local()
+
+
+def get_thread_drive_service(creds):
+    """Drive client owned by the calling thread.
+
+    httplib2.Http is not thread-safe, so upload workers must not share the
+    cached service from get_drive_service().
+    """
+    drive = getattr(_thread_local, "drive", None)
+    if drive is None:
+        drive = build_drive_service(creds)
+        _thread_local.drive = drive
+    return drive
+
+
 def find_or_create_folder(drive, parent_id: str, name: str) -> str:
     q = (
         f"'{parent_id}' in parents and "
@@ -159,7 +309,7 @@ def find_or_create_folder(drive, parent_id: str, name: str) -> str:
         "mimeType = 'application/vnd.google-apps.folder' and "
         "trashed = false"
     )
-    res = drive.files().list(q=q, fields="files(id,name)").execute(num_retries=3)
+    res = drive.files().list(q=q, fields="files(id)").execute(num_retries=3)
     files = res.get("files", [])
     if files:
         return files[0]["id"]
@@ -173,90 +323,108 @@ def find_or_create_folder(drive, parent_id: str, name: str) -> str:
     return folder["id"]
 
 
-def get_subfolder_ids(drive):
-    if "subfolder_ids" in st.session_state:
-        return st.session_state["subfolder_ids"]
+@st.cache_resource(show_spinner=False)
+def get_subfolder_ids(_drive):
+    """Resolve all SUBFOLDERS with one files.list; cached for every session in the process."""
+    names = " or ".join(f"name = '{name}'" for name in SUBFOLDERS)
+    q = (
+        f"'{DXF_SHARED_FOLDER_ID}' in parents and "
+        "mimeType = 'application/vnd.google-apps.folder' and "
+        "trashed = false and "
+        f"({names})"
+    )
+    res = _drive.files().list(q=q, fields="files(id,name)").execute(num_retries=3)
+    found = {}
+    for f in res.get("files", []):
+        found.setdefault(f["name"], f["id"])
 
     ids = {}
     for name in SUBFOLDERS:
-        ids[name] = find_or_create_folder(drive, DXF_SHARED_FOLDER_ID, name)
-
-    st.session_state["subfolder_ids"] = ids
+        # Only missing folders cost an extra round-trip (create)
+        ids[name] = found.get(name) or find_or_create_folder(_drive, DXF_SHARED_FOLDER_ID, name)
     return ids
 
 
-def upload_file_to_folder(drive, folder_id: str, filename: str, file_obj, mime: str):
+def _stream_size(file_obj) -> int:
+    size = getattr(file_obj, "size", None)  # Streamlit's UploadedFile knows its size
+    if size is not None:
+        return size
+    pos = file_obj.tell()
+    file_obj.seek(0, 2)
+    size = file_obj.tell()
+    file_obj.seek(pos)
+    return size
+
+
+def upload_file_to_folder(drive, folder_id: str, filename: str, file_obj, mime: str, progress_cb=None):
     """Upload a file-like object to Drive.
 
-    IMPORTANT: We intentionally default to *non-resumable* multipart upload.
-    We've seen 'Redirected but the response is missing a Location: header.'
-    when using resumable uploads in some environments. Multipart is more stable
-    for files in our size range.
+    Files under RESUMABLE_MIN_BYTES use a single *non-resumable* multipart
+    upload (one round-trip). Larger files use resumable uploads in
+    UPLOAD_CHUNK_BYTES chunks, so a network error only resends the current
+    chunk. (The old 'Redirected but the response is missing a Location:
+    header.' error came from the transport following 308; see
+    build_drive_service.)
+    progress_cb(fraction) is called after each chunk (from the calling thread).
     """
     try:
         file_obj.seek(0)
     except Exception:
         pass
 
-    media = MediaIoBaseUpload(file_obj, mimetype=mime, resumable=False)
     metadata = {"name": filename, "parents": [folder_id]}
-    req = drive.files().create(body=metadata, media_body=media, fields="id,name,size,createdTime")
-    # execute with retry/backoff
-    return drive_execute(req, retries=6, base_sleep=0.8)
+    fields = "id,name,size,createdTime"
 
+    if _stream_size(file_obj) < RESUMABLE_MIN_BYTES:
+        media = MediaIoBaseUpload(file_obj, mimetype=mime, resumable=False)
+        req = drive.files().create(body=metadata, media_body=media, fields=fields)
+        # execute with retry/backoff
+        return drive_execute(req, retries=6, base_sleep=0.8, write=True)
 
-def upsert_json_file(drive, folder_id: str, filename: str, payload: dict):
-    q = (
-        f"'{folder_id}' in parents and "
-        f"name = '{filename}' and "
-        "mimeType != 'application/vnd.google-apps.folder' and "
-        "trashed = false"
-    )
-    res = drive.files().list(q=q, fields="files(id,name)").execute()
-    files = res.get("files", [])
+    media = MediaIoBaseUpload(file_obj, mimetype=mime, chunksize=UPLOAD_CHUNK_BYTES, resumable=True)
+    req = drive.files().create(body=metadata, media_body=media, fields=fields)
+    response = None
+    while response is None:
+        get_drive_writes().acquire()  # each chunk is its own PUT
+        status, response = _with_retry(lambda: req.next_chunk(num_retries=5), what="INBOX 업로드")
+        if status is not None and progress_cb is not None:
+            progress_cb(status.progress())
+    return response
 
-    data = json.dumps(payload, ensure_ascii=False, indent=2).encode("utf-8")
-    media = MediaIoBaseUpload(BytesIO(data), mimetype="application/json", resumable=False)
 
-    if files:
-        file_id = files[0]["id"]
-        updated = drive.files().update(fileId=file_id, media_body=media).execute()
-        return updated
-    else:
-        meta = {"name": filename, "parents": [folder_id]}
-        created = drive.files().create(body=meta, media_body=media, fields="id").execute()
-        return created
+def _json_dumps(payload: dict) -> bytes:
+    # Compact UTF-8 either way: manifests with many items shrink noticeably vs. indent=2
+    if orjson is not None:
+        return orjson.dumps(payload, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
 
 
-def read_json_file_by_name(drive, folder_id: str, filename: str) -> dict | None:
-    q = (
-        f"'{folder_id}' in parents and "
-        f"name = '{filename}' and "
-        "trashed = false"
-    )
-    res = drive.files().list(q=q, fields="files(id,name)").execute()
-    files = res.get("files", [])
-    if not files:
-        return None
+def _json_loads(data: bytes):
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data.decode("utf-8"))
 
-    file_id = files[0]["id"]
-    request = drive.files().get_media(fileId=file_id)
 
-    buf = BytesIO()
-    downloader = MediaIoBaseDownload(buf, request)
-    done = False
-    while not done:
-        _, done = _with_retry(lambda: downloader.next_chunk(), what='META 읽기')
+def _json_media(payload: dict) -> MediaIoBaseUpload:
+    return MediaIoBaseUpload(BytesIO(_json_dumps(payload)), mimetype="application/json", resumable=False)
 
-    buf.seek(0)
-    return json.loads(buf.read().decode("utf-8"))
+
+def create_json_file(drive, folder_id: str, filename: str, payload: dict):
+    """Create a JSON file whose name is known to be new (no by-name lookup first)."""
+    meta = {"name": filename, "parents": [folder_id]}
+    get_drive_writes().acquire()
+    return drive.files().create(body=meta, media_body=_json_media(payload), fields="id").execute()
 
 
 def list_recent_jobs(drive, meta_folder_id: str, limit: int = 20):
-    q = f"'{meta_folder_id}' in parents and trashed=false"
+    # Heartbeats are rewritten constantly and would otherwise take the top
+    # modifiedTime slots of the page. Drive's `contains` is a prefix match on
+    # names, which is exactly the __worker__ naming; the suffix filter below
+    # still has to run client-side.
+    q = f"'{meta_folder_id}' in parents and trashed=false and not name contains '__worker__'"
     req = drive.files().list(
         q=q,
-        fields="files(id,name,createdTime,modifiedTime,size)",
+        fields="files(id,name,modifiedTime)",
         orderBy="modifiedTime desc",
         pageSize=limit,
     )
@@ -276,14 +444,66 @@ def list_recent_jobs(drive, meta_folder_id: str, limit: int = 20):
     return files
 
 
-def download_file_bytes(drive, file_id: str) -> bytes:
-    request = drive.files().get_media(fileId=file_id)
-    buf = BytesIO()
-    downloader = MediaIoBaseDownload(buf, request)
-    done = False
-    while not done:
-        _, done = _with_retry(lambda: downloader.next_chunk(), what='META 읽기')
-    return buf.getvalue()
+def download_file(drive, file_id: str, out, size: int | None = None, progress_cb=None) -> None:
+    """Download a Drive file into the seekable binary stream `out`.
+
+    progress_cb(fraction) is called on the calling thread.
+
+    Files of at least PARALLEL_DOWNLOAD_MIN_BYTES (when `size` is known) are
+    fetched as DOWNLOAD_STREAMS concurrent Range requests on per-thread clients.
+    """
+    if size and size >= PARALLEL_DOWNLOAD_MIN_BYTES:
+        creds = get_drive_credentials()
+        span = -(-size // DOWNLOAD_STREAMS)
+        ranges = [(start, min(start + span, size) - 1) for start in range(0, size, span)]
+
+        def _fetch_range(byte_range):
+            start, end = byte_range
+            req = get_thread_drive_service(creds).files().get_media(fileId=file_id)
+            req.headers["Range"] = f"bytes={start}-{end}"
+            return start, drive_execute(req, retries=3)
+
+        received = 0
+        with ThreadPoolExecutor(max_workers=len(ranges)) as executor:
+            for fut in as_completed([executor.submit(_fetch_range, r) for r in ranges]):
+                start, chunk = fut.result()
+                # Parts land at their own offsets; writes stay on this thread
+                out.seek(start)
+                out.write(chunk)
+                received += len(chunk)
+                if progress_cb is not None:
+                    progress_cb(received / size)
+    else:
+        request = drive.files().get_media(fileId=file_id)
+        downloader = MediaIoBaseDownload(out, request, chunksize=DOWNLOAD_CHUNK_BYTES)
+        done = False
+        while not done:
+            status, done = _with_retry(lambda: downloader.next_chunk(num_retries=3), what='파일 다운로드')
+            if status is not None and progress_cb is not None:
+                progress_cb(status.progress())
+
+
+@st.cache_resource(show_spinner=False)
+def _download_dir() -> Path:
+    """Process-wide scratch dir for prepared downloads, removed at exit."""
+    path = Path(tempfile.mkdtemp(prefix="dxf-client-"))
+    atexit.register(shutil.rmtree, path, ignore_errors=True)
+    return path
+
+
+def download_json(drive, file_id: str) -> dict:
+    # Small JSON: one get_media().execute() instead of the chunked downloader loop
+    data = drive_execute(drive.files().get_media(fileId=file_id), retries=3)
+    return _json_loads(data)
+
+
+@st.cache_data(ttl=15, show_spinner=False)
+def _download_heartbeat(file_id: str, modified_time: str, _creds) -> dict:
+    """Heartbeat JSON, cached per (file_id, modifiedTime) so unchanged files are not re-fetched.
+
+    Safe to call from worker threads: it uses the calling thread's Drive client.
+    """
+    return download_json(get_thread_drive_service(_creds), file_id)
 
 
 def find_file_in_folder_by_name(drive, folder_id: str, filename: str):
@@ -292,7 +512,7 @@ def find_file_in_folder_by_name(drive, folder_id: str, filename: str):
         f"name = '{filename}' and "
         "trashed = false"
     )
-    res = drive.files().list(q=q, fields="files(id,name,size,modifiedTime)").execute()
+    res = drive.files().list(q=q, fields="files(id,size)").execute()
     files = res.get("files", [])
     return files[0] if files else None
 
@@ -305,15 +525,14 @@ def _safe_name(name: str) -> str:
     # Replace spaces with underscores
     safe = safe.replace(" ", "_")
     # Remove any remaining problematic characters (keep ASCII only for stability)
-    safe = "".join(c for c in safe if c.isascii() and (c.isalnum() or c in ("-", "_", ".")))
+    safe = _UNSAFE_FILENAME_CHARS.sub("", safe)
     return safe if safe else "file.dxf"
 
 
 def _make_batch_id() -> str:
     """Generate time-sortable batch ID"""
-    ts = now_seoul_iso().replace(":", "").replace("-", "").replace("+0900", "").replace("T", "_")
-    ts = ts.split(".")[0].replace("+09:00", "").replace("+0900", "")
-    return f"{ts}_{uuid.uuid4().hex[:8]}"
+    ts = datetime.now(SEOUL_TZ).strftime("%Y%m%d_%H%M%S")
+    return f"{ts}_{os.urandom(4).hex()}"
 
 
 # =========================
@@ -324,6 +543,8 @@ def _parse_iso_dt(s: str):
     if not s:
         return None
     try:
+        if _parse_iso_fast is not None:
+            return _parse_iso_fast(s)
         if s.endswith("Z"):
             s = s[:-1] + "+00:00"
         return datetime.fromisoformat(s)
@@ -331,50 +552,23 @@ def _parse_iso_dt(s: str):
         return None
 
 
-def list_worker_heartbeats(drive, meta_folder_id: str, ttl_sec: int = 30):
-    """
-    Returns:
-      active_workers: list[dict] (updated within ttl_sec)
-      last_seen: datetime (most recent heartbeat regardless of ttl), or None
-    Notes:
-      Uses local datetime module alias to avoid import-name collisions.
-    """
-    import datetime as _dt
-
-    def _parse_iso_dt(s: str):
-        if not s:
-            return None
-        try:
-            if s.endswith("Z"):
-                s = s[:-1] + "+00:00"
-            return _dt.datetime.fromisoformat(s)
-        except Exception:
-            return None
-
-    # META에서 __worker__*.json 찾기 (Drive query의 name contains가 환경에 따라 누락되는 경우가 있어 전체 목록 후 필터링)
-    res = drive.files().list(
-        q=f"'{meta_folder_id}' in parents and trashed=false",
-        fields="files(id,name)",
-        orderBy="modifiedTime desc",
-        pageSize=200,
-    ).execute()
-    files = [f for f in res.get("files", []) if (f.get("name","").startswith("__worker__") and f.get("name","").lower().endswith(".json"))]
+def _collect_active_workers(heartbeats, ttl_sec: int):
+    """Filter heartbeat dicts to those with updated_at within ttl_sec.
 
-
-    now = _dt.datetime.now(_dt.timezone.utc)
+    Returns (active_workers, last_seen); active is newest first.
+    """
+    now = datetime.now(timezone.utc)
 
     active = []
     last_seen = None
 
-    for f in files:
+    for hb in heartbeats:
         try:
-            hb = download_json(drive, f["id"])  # 기존 함수 재사용
-            updated_at = hb.get("updated_at")
-            hb_time = _parse_iso_dt(updated_at)
+            hb_time = _parse_iso_dt(hb.get("updated_at"))
             if hb_time is None:
                 continue
             if hb_time.tzinfo is None:
-                hb_time = hb_time.replace(tzinfo=_dt.timezone.utc)
+                hb_time = hb_time.replace(tzinfo=timezone.utc)
 
             # last_seen 갱신
             if last_seen is None or hb_time > last_seen:
@@ -388,32 +582,152 @@ def list_worker_heartbeats(drive, meta_folder_id: str, ttl_sec: int = 30):
             continue
 
     # 최근 업데이트 우선 정렬
-    active.sort(key=lambda x: x.get("_hb_time") or _dt.datetime.min.replace(tzinfo=_dt.timezone.utc), reverse=True)
+    active.sort(key=lambda x: x.get("_hb_time") or datetime.min.replace(tzinfo=timezone.utc), reverse=True)
     return active, last_seen
 
 
-#     active = []
-#     for f in files:
-#         try:
-#             meta = download_json(drive, f["id"])
-#             if job_meta.get("type") != "worker_heartbeat":
-#                 continue
-#             updated_at = job_meta.get("updated_at")
-#             if not updated_at:
-#                 continue
-#             # Python 3.9: fromisoformat handles '+09:00' offsets
-#             dt = _dt.datetime.fromisoformat(updated_at)
-#             if dt.tzinfo is None:
-#                 dt = dt.replace(tzinfo=_dt.timezone.utc)
-#             age = (now - dt.astimezone(_dt.timezone.utc)).total_seconds()
-#             if age <= ttl_sec:
-#                 active.append((age, meta))
-#         except Exception:
-#             continue
-
-#     # sort by worker_id for stable ordering (not by age)
-#     active.sort(key=lambda x: (x[1].get("worker_id") or "", x[0]))
-#     return [m for _, m in active]
+def list_worker_presence(ttl_sec: int = 30):
+    """Worker presence from RTDB: one read of /workers instead of N Drive downloads."""
+    data = db.reference(WORKERS_PATH).get() or {}
+    heartbeats = []
+    for worker_id, hb in data.items():
+        if isinstance(hb, dict):
+            heartbeats.append({"worker_id": worker_id, **hb})
+    return _collect_active_workers(heartbeats, ttl_sec)
+
+
+def list_worker_heartbeats(drive, meta_folder_id: str, ttl_sec: int = 30):
+    """
+    Returns:
+      active_workers: list[dict] (updated within ttl_sec)
+      last_seen: datetime (most recent heartbeat regardless of ttl), or None
+    Notes:
+      Uses RTDB presence (/workers) when [rtdb] is configured, readable and
+      non-empty; otherwise falls back to the legacy __worker__*.json heartbeat
+      files in META (workers that haven't moved to RTDB only write those).
+    """
+    try:
+        if init_rtdb():
+            active, last_seen = list_worker_presence(ttl_sec)
+            if last_seen is not None:
+                return active, last_seen
+    except Exception:
+        pass  # RTDB denied/unreachable: the Drive heartbeat files below still work
+
+    # META에서 __worker__*.json 찾기 (Drive query의 name contains가 환경에 따라 누락되는 경우가 있어 전체 목록 후 필터링)
+    res = drive.files().list(
+        q=f"'{meta_folder_id}' in parents and trashed=false",
+        fields="files(id,name,modifiedTime,appProperties)",
+        orderBy="modifiedTime desc",
+        pageSize=200,
+    ).execute()
+    files = [f for f in res.get("files", []) if (f.get("name","").startswith("__worker__") and f.get("name","").lower().endswith(".json"))]
+
+    heartbeats = []
+    to_download = []
+    for f in files:
+        # Workers that mirror the heartbeat into appProperties save us the JSON download
+        props = f.get("appProperties") or {}
+        if props.get("updated_at"):
+            heartbeats.append(dict(props))
+        else:
+            to_download.append(f)
+
+    if to_download:
+        creds = get_drive_credentials()
+
+        def _fetch(f):
+            try:
+                return _download_heartbeat(f["id"], f.get("modifiedTime", ""), creds)
+            except Exception:
+                return None
+
+        with ThreadPoolExecutor(max_workers=min(HEARTBEAT_WORKERS, len(to_download))) as executor:
+            heartbeats.extend(hb for hb in executor.map(_fetch, to_download) if hb is not None)
+
+    return _collect_active_workers(heartbeats, ttl_sec)
+
+
+# Cached views for the UI: reruns within STATUS_CACHE_TTL (widget clicks,
+# auto-refresh ticks) reuse the last Drive response. `_drive` is not hashed.
+@st.cache_data(ttl=STATUS_CACHE_TTL, show_spinner=False)
+def _cached_recent_jobs(_drive, meta_folder_id: str, limit: int):
+    return list_recent_jobs(_drive, meta_folder_id, limit)
+
+
+@st.cache_data(ttl=STATUS_CACHE_TTL, show_spinner=False)
+def _cached_worker_heartbeats(_drive, meta_folder_id: str, ttl_sec: int):
+    return list_worker_heartbeats(_drive, meta_folder_id, ttl_sec)
+
+
+@st.cache_data(ttl=STATUS_CACHE_TTL, show_spinner=False)
+def _cached_json_ref(_drive, folder_id: str, filename: str):
+    """{id, modifiedTime} of a JSON file by name; the body is cached separately."""
+    q = (
+        f"'{folder_id}' in parents and "
+        f"name = '{filename}' and "
+        "trashed = false"
+    )
+    res = drive_execute(_drive.files().list(q=q, fields="files(id,modifiedTime)"), retries=3)
+    files = res.get("files", [])
+    return files[0] if files else None
+
+
+@st.cache_data(max_entries=256, show_spinner=False)
+def _cached_json_body(_drive, file_id: str, modified_time: str | None) -> dict:
+    """JSON body keyed by (file_id, modifiedTime): re-downloaded only after the file changes."""
+    return download_json(_drive, file_id)
+
+
+def _read_json_cached(drive, folder_id: str, filename: str, index: dict | None = None) -> dict | None:
+    """Two-stage cached read. `index` ({name: file}) skips the name lookup on a hit."""
+    ref = (index or {}).get(filename) or _cached_json_ref(drive, folder_id, filename)
+    if not ref:
+        return None
+    return _cached_json_body(drive, ref["id"], ref.get("modifiedTime"))
+
+
+@st.cache_data(ttl=STATUS_CACHE_TTL, show_spinner=False)
+def _cached_batch_metas(_drive, meta_folder_id: str, job_ids: tuple) -> dict:
+    """{job_id: META} for a whole batch: OR-name listings, then parallel body downloads."""
+    refs = []
+    for i in range(0, len(job_ids), META_NAMES_PER_QUERY):
+        names = " or ".join(f"name = '{jid}.json'" for jid in job_ids[i:i + META_NAMES_PER_QUERY])
+        q = f"'{meta_folder_id}' in parents and trashed = false and ({names})"
+        page_token = None
+        while True:
+            res = drive_execute(
+                _drive.files().list(
+                    q=q,
+                    fields="nextPageToken,files(id,name,modifiedTime)",
+                    pageSize=100,
+                    pageToken=page_token,
+                ),
+                retries=3,
+            )
+            refs.extend(res.get("files", []))
+            page_token = res.get("nextPageToken")
+            if not page_token:
+                break
+    if not refs:
+        return {}
+
+    creds = get_drive_credentials()
+
+    def _fetch(f):
+        try:
+            body = _cached_json_body(get_thread_drive_service(creds), f["id"], f.get("modifiedTime"))
+        except Exception:
+            return None
+        return f["name"][: -len(".json")], body
+
+    with ThreadPoolExecutor(max_workers=min(META_READ_WORKERS, len(refs))) as executor:
+        return dict(r for r in executor.map(_fetch, refs) if r is not None)
+
+
+@st.cache_data(ttl=STATUS_CACHE_TTL, show_spinner=False)
+def _cached_find_file(_drive, folder_id: str, filename: str):
+    return find_file_in_folder_by_name(_drive, folder_id, filename)
 
 
 # UI
@@ -461,6 +775,7 @@ st.success("✅ Connected to Google Drive")
 st.sidebar.header("Options")
 auto_refresh = st.sidebar.checkbox("Auto-refresh status", value=True)
 refresh_sec = st.sidebar.slider("Refresh interval (sec)", 3, 30, 5)
+upload_workers = st.sidebar.slider("Parallel uploads", 1, UPLOAD_WORKERS, min(4, UPLOAD_WORKERS))
 
 
 # Worker heartbeat timeout (sec)
@@ -468,7 +783,7 @@ HEARTBEAT_TIMEOUT = 30  # worker is considered alive if heartbeat within this wi
 
 st.sidebar.divider()
 st.sidebar.subheader("Worker status")
-active_workers, last_seen = list_worker_heartbeats(drive, folders["META"], ttl_sec=HEARTBEAT_TIMEOUT)
+active_workers, last_seen = _cached_worker_heartbeats(drive, folders["META"], HEARTBEAT_TIMEOUT)
 
 # --- Debug/Status variables (used by Developer Debug Panel) ---
 worker_heartbeat_raw = active_workers[0] if active_workers else {}
@@ -550,71 +865,122 @@ if uploaded_list:
             ok_count = 0
             errors = []
 
-            with st.spinner("Uploading..."):
-                for idx, uploaded in enumerate(uploaded_list, 1):
+            creds = get_drive_credentials()
+
+            # Names and ids are minted here on the main thread, so worker threads
+            # spend their time in network I/O rather than string/id work.
+            specs = []
+            for uploaded in uploaded_list:
+                safe_orig = _safe_name(uploaded.name)
+                specs.append((uploaded, safe_orig, make_job_id(safe_orig)))
+
+            # Per-file upload fraction: written by worker threads, summed by the main thread
+            file_progress = [0.0] * total_files
+
+            def _upload_one(spec, pos):
+                """Upload one DXF to INBOX and write its META (runs in a worker thread)."""
+                uploaded, safe_orig, job_id = spec
+
+                def _on_chunk(fraction):
+                    file_progress[pos] = fraction
+
+                drive_t = get_thread_drive_service(creds)
+                # Streamlit's UploadedFile is a file-like object.
+                # Avoid .getvalue() to prevent large in-memory copies.
+                file_obj = uploaded
+                try:
+                    file_obj.seek(0)
+                except Exception:
+                    pass
+
+                inbox_name = f"{job_id}__{safe_orig}"
+                meta_filename = f"{job_id}.json"
+
+                meta_payload = {
+                    "batch_id": batch_id,
+                    "job_id": job_id,
+                    "original_name": safe_orig,
+                    "inbox_name": inbox_name,
+                    "status": "queued",
+                    "created_at": created_at,
+                    "updated_at": created_at,
+                    "progress": 0,
+                    "message": "Uploaded to INBOX. Waiting for local worker.",
+                    "done_file": None,
+                    "error": None,
+                }
+
+                # 1) Upload DXF to INBOX
+                resp = upload_file_to_folder(
+                    drive_t,
+                    folders["INBOX"],
+                    inbox_name,
+                    file_obj,
+                    mime=getattr(uploaded, "type", None) or "application/dxf",
+                    progress_cb=_on_chunk,
+                )
+                meta_payload["inbox_file_id"] = resp.get("id")
+                meta_payload["progress"] = 5
+                meta_payload["updated_at"] = now_seoul_iso()
+
+                # 2) Create META (job_id is unique, so no existence check); without it
+                #    the worker never sees the INBOX file, so remove the upload rather
+                #    than leave an orphan on Drive.
+                try:
+                    create_json_file(drive_t, folders["META"], meta_filename, meta_payload)
+                except Exception:
                     try:
-                        safe_orig = _safe_name(uploaded.name)
-                        # Streamlit's UploadedFile is a file-like object.
-                        # Avoid .getvalue() to prevent large in-memory copies.
-                        file_obj = uploaded
-                        try:
-                            file_obj.seek(0)
-                        except Exception:
-                            pass
-
-                        job_id = make_job_id(safe_orig)
-
-                        inbox_name = f"{job_id}__{safe_orig}"
-                        meta_filename = f"{job_id}.json"
-
-                        meta_payload = {
-                            "batch_id": batch_id,
-                            "job_id": job_id,
-                            "original_name": safe_orig,
-                            "inbox_name": inbox_name,
-                            "status": "queued",
-                            "created_at": created_at,
-                            "updated_at": now_seoul_iso(),
-                            "progress": 0,
-                            "message": "Uploaded to INBOX. Waiting for local worker.",
-                            "done_file": None,
-                            "error": None,
-                        }
-
-                        # 1) Upload DXF to INBOX
-                        resp = upload_file_to_folder(
-                            drive,
-                            folders["INBOX"],
-                            inbox_name,
-                            file_obj,
-                            mime=getattr(uploaded, "type", None) or "application/dxf"
-                        )
-                        meta_payload["inbox_file_id"] = resp.get("id")
-                        meta_payload["progress"] = 5
-                        meta_payload["updated_at"] = now_seoul_iso()
-
-                        # 2) Upsert META
-                        upsert_json_file(drive, folders["META"], meta_filename, meta_payload)
-
-                        # 3) Add to manifest
-                        manifest_payload["items"].append({
-                            "job_id": job_id,
-                            "meta_filename": meta_filename,
-                            "original_name": safe_orig,
-                            "inbox_name": inbox_name,
-                            "inbox_file_id": meta_payload.get("inbox_file_id"),
-                            "status": "queued",
-                        })
-
-                        ok_count += 1
-
-                    except Exception as e:
-                        errors.append({"file": uploaded.name, "error": str(e)})
-
-                    # UI progress update
-                    pct = int((idx / total_files) * 100)
-                    progress.progress(pct)
-                    status_box.write(f"Upload progress: {idx}/{total_files} (success {ok_count} / failed {len(errors)})")
+                        get_drive_writes().acquire()
+                        drive_t.files().delete(fileId=meta_payload["inbox_file_id"]).execute()
+                    except Exception:
+                        pass
+                    raise
+
+                # 3) Manifest item (appended on the main thread)
+                return job_id, {
+                    "job_id": job_id,
+                    "meta_filename": meta_filename,
+                    "original_name": safe_orig,
+                    "inbox_name": inbox_name,
+                    "inbox_file_id": meta_payload.get("inbox_file_id"),
+                    "status": "queued",
+                }
+
+            with st.spinner("Uploading..."):
+                # Manifest items keep the uploader's order, not completion order.
+                items_by_pos = [None] * total_files
+                with ThreadPoolExecutor(max_workers=upload_workers) as executor:
+                    futures = {
+                        executor.submit(_upload_one, spec, pos): (pos, spec[0])
+                        for pos, spec in enumerate(specs)
+                    }
+                    # Streamlit elements are only touched from the main thread. Waking up
+                    # every PROGRESS_UPDATE_SEC lets chunk progress show between completions.
+                    pending = set(futures)
+                    done_count = 0
+                    last_ui_update = 0.0
+                    while pending:
+                        done, pending = wait(pending, timeout=PROGRESS_UPDATE_SEC, return_when=FIRST_COMPLETED)
+                        for fut in done:
+                            done_count += 1
+                            pos, uploaded = futures[fut]
+                            file_progress[pos] = 1.0
+                            try:
+                                _, item = fut.result()
+                                items_by_pos[pos] = item
+                                ok_count += 1
+                            except Exception as e:
+                                errors.append({"file": uploaded.name, "error": str(e)})
+
+                        # UI progress update, throttled: each element update is a websocket frame
+                        now_mono = time.monotonic()
+                        if not pending or now_mono - last_ui_update >= PROGRESS_UPDATE_SEC:
+                            last_ui_update = now_mono
+                            pct = int(sum(file_progress) / total_files * 100)
+                            progress.progress(pct)
+                            status_box.write(f"Upload progress: {done_count}/{total_files} (success {ok_count} / failed {len(errors)})")
+
+            manifest_payload["items"] = [item for item in items_by_pos if item is not None]
 
             # Finalize manifest
             manifest_payload["updated_at"] = now_seoul_iso()
@@ -628,7 +994,8 @@ if uploaded_list:
 
             # Write manifest
             try:
-                upsert_json_file(drive, folders["META"], manifest_filename, manifest_payload)
+                create_json_file(drive, folders["META"], manifest_filename, manifest_payload)
+                _cached_recent_jobs.clear()  # show the new jobs right away
             except Exception as e:
                 st.error("❌ Failed to save manifest")
                 st.exception(e)
@@ -646,89 +1013,174 @@ if uploaded_list:
 
 st.subheader("2) Job Status / Download")
 
-# Load recent jobs
-recent = list_recent_jobs(drive, folders["META"], limit=30)
-recent_ids = [f["name"].replace(".json", "") for f in recent]
+# Full reruns only happen on user input (fragment ticks don't reach this line).
+st.session_state["last_active"] = time.monotonic()
 
-default_job = st.session_state.get("active_job_id")
-if default_job and default_job in recent_ids:
-    default_index = recent_ids.index(default_job)
-else:
-    default_index = 0 if recent_ids else None
 
-job_id = None
-if recent_ids:
-    job_id = st.selectbox("Select recent job", recent_ids, index=default_index)
-else:
-    st.info("No jobs in META folder yet. Upload files first.")
+def _mark_active():
+    st.session_state["last_active"] = time.monotonic()
 
-# Auto refresh
-def do_autorefresh():
-    try:
-        from streamlit import st_autorefresh
-        st_autorefresh(interval=refresh_sec * 1000, key="job_poll")
-    except Exception:
-        pass
 
-if auto_refresh:
-    do_autorefresh()
+# Auto refresh: only this fragment reruns on the timer; the uploader, sidebar
+# and Drive bootstrap above are not re-executed on each tick. Once everything
+# on screen is done/error the timer is dropped (run_every is fixed per full run,
+# so the panel triggers one full rerun whenever that state flips).
+@st.fragment(run_every=refresh_sec if auto_refresh and not st.session_state.get("panel_final") else None)
+def job_status_panel():
+    # Idle (or hidden) tabs keep ticking; stop spending Drive quota on them.
+    idle_sec = time.monotonic() - st.session_state.get("last_active", 0.0)
+    if auto_refresh and idle_sec > IDLE_PAUSE_SEC:
+        st.info("Auto-refresh paused after inactivity.")
+        st.button("Resume", on_click=_mark_active)  # the click reruns this fragment
+        return
 
-col_a, col_b = st.columns([1, 1])
-with col_a:
-    manual_refresh = st.button("Refresh Status")
-with col_b:
-    st.caption("Use button if auto-refresh doesn't work")
+    # Load recent jobs
+    recent = _cached_recent_jobs(drive, folders["META"], 30)
+    recent_ids = [f["name"].replace(".json", "") for f in recent]
+    # The listing already carries file ids: {name: file} lets META reads skip the by-name query
+    meta_index = {f["name"]: f for f in recent}
 
-if job_id:
-    job_meta_name = f"{job_id}.json"
-    try:
-        job_meta = read_json_file_by_name(drive, folders["META"], job_meta_name)
-    except Exception as e:
-        st.error(f"Failed to read META\n\n{type(e).__name__}: {e}")
-        job_meta = None
-
-
-    if job_meta:
-        st.write(f"**status:** `{job_meta.get('status')}`")
-        st.write(f"**updated_at:** `{job_meta.get('updated_at')}`")
-        st.write(f"**message:** {job_meta.get('message')}")
-        prog = int(job_meta.get("progress", 0) or 0)
-        st.progress(min(max(prog, 0), 100) / 100.0)
-
-        if job_meta.get("status") == "error":
-            st.error("Job failed")
-            if job_meta.get("error"):
-                st.code(job_meta.get("error"))
-
-        if job_meta.get("status") == "done":
-            done_file = job_meta.get("done_file")
-            if not done_file:
-                st.warning("Status is 'done' but done_file is missing in META")
-            else:
-                st.success("✅ Translation completed")
-                st.write(f"Result file: `{done_file}`")
+    default_job = st.session_state.get("active_job_id")
+    if default_job and default_job in recent_ids:
+        default_index = recent_ids.index(default_job)
+    else:
+        default_index = 0 if recent_ids else None
 
-                done_obj = find_file_in_folder_by_name(drive, folders["DONE"], done_file)
-                if not done_obj:
-                    st.warning("Result file not found in DONE folder yet. Please try again later.")
+    job_id = None
+    if recent_ids:
+        job_id = st.selectbox("Select recent job", recent_ids, index=default_index, on_change=_mark_active)
+    else:
+        st.info("No jobs in META folder yet. Upload files first.")
+
+    col_a, col_b = st.columns([1, 1])
+    with col_a:
+        manual_refresh = st.button("Refresh Status", on_click=_mark_active)
+    with col_b:
+        st.caption("Use button if auto-refresh doesn't work")
+
+    if manual_refresh:
+        # Bodies are keyed by modifiedTime, so only the listings need dropping
+        _cached_recent_jobs.clear()
+        _cached_json_ref.clear()
+        _cached_batch_metas.clear()
+        recent = _cached_recent_jobs(drive, folders["META"], 30)
+        meta_index = {f["name"]: f for f in recent}
+
+    # Whole-batch overview: one listing for every job instead of one read per selection
+    batch_job_ids = st.session_state.get("active_job_ids") or []
+    batch_pending = False
+    if len(batch_job_ids) > 1:
+        try:
+            batch_metas = _cached_batch_metas(drive, folders["META"], tuple(batch_job_ids))
+        except Exception as e:
+            batch_pending = True  # unknown, so keep polling
+            st.warning(f"Failed to read batch status\n\n{type(e).__name__}: {e}")
+        else:
+            rows = []
+            for jid in batch_job_ids:
+                m = batch_metas.get(jid) or {}
+                batch_pending = batch_pending or m.get("status") not in TERMINAL_STATUSES
+                rows.append({
+                    "job_id": jid,
+                    "status": m.get("status", "?"),
+                    "progress": int(m.get("progress", 0) or 0),
+                    "updated_at": m.get("updated_at"),
+                })
+            st.caption(f"Current batch: {st.session_state.get('active_batch_id', '')}")
+            st.dataframe(rows, hide_index=True, use_container_width=True)
+
+    job_meta = None
+    if job_id:
+        job_meta_name = f"{job_id}.json"
+        try:
+            job_meta = _read_json_cached(drive, folders["META"], job_meta_name, index=meta_index)
+        except Exception as e:
+            st.error(f"Failed to read META\n\n{type(e).__name__}: {e}")
+            job_meta = None
+
+
+        if job_meta:
+            st.write(f"**status:** `{job_meta.get('status')}`")
+            st.write(f"**updated_at:** `{job_meta.get('updated_at')}`")
+            st.write(f"**message:** {job_meta.get('message')}")
+            prog = int(job_meta.get("progress", 0) or 0)
+            st.progress(min(max(prog, 0), 100) / 100.0)
+
+            if job_meta.get("status") == "error":
+                st.error("Job failed")
+                if job_meta.get("error"):
+                    st.code(job_meta.get("error"))
+
+            if job_meta.get("status") == "done":
+                done_file = job_meta.get("done_file")
+                if not done_file:
+                    st.warning("Status is 'done' but done_file is missing in META")
                 else:
-                    try:
-                        with st.spinner("Preparing download... (may take time for large files)"):
-                            data = download_file_bytes(drive, done_obj["id"])
-
-                        st.download_button(
-                            label="Download Result DXF",
-                            data=data,
-                            file_name=done_file,
-                            mime="application/dxf",
-                            type="primary",
-                        )
-                    except Exception as e:
-                        st.error("Failed to prepare download")
-                        st.exception(e)
+                    st.success("✅ Translation completed")
+                    st.write(f"Result file: `{done_file}`")
+
+                    done_obj = _cached_find_file(drive, folders["DONE"], done_file)
+                    if not done_obj:
+                        st.warning("Result file not found in DONE folder yet. Please try again later.")
+                    else:
+                        # Fetch the result only on request: auto-refresh reruns this block every
+                        # few seconds, and re-downloading a large DXF each tick is wasted I/O.
+                        # The result is spooled to disk, so session state holds just a path;
+                        # keep only the most recent result per session.
+                        cached = st.session_state.get("done_download")
+                        if cached and not cached[1].exists():
+                            cached = None
+                        if not cached or cached[0] != done_obj["id"]:
+                            cached = None
+                            if st.button("Prepare Download"):
+                                path = _download_dir() / f"{os.urandom(8).hex()}.dxf"
+                                try:
+                                    download_bar = st.progress(0.0, text="Preparing download...")
+                                    with path.open("wb") as out:
+                                        download_file(
+                                            drive,
+                                            done_obj["id"],
+                                            out,
+                                            size=int(done_obj.get("size") or 0),
+                                            progress_cb=download_bar.progress,
+                                        )
+                                    download_bar.empty()
+                                except Exception as e:
+                                    path.unlink(missing_ok=True)
+                                    st.error("Failed to prepare download")
+                                    st.exception(e)
+                                else:
+                                    previous = st.session_state.get("done_download")
+                                    if previous:
+                                        previous[1].unlink(missing_ok=True)
+                                    cached = (done_obj["id"], path)
+                                    st.session_state["done_download"] = cached
+
+                        if cached:
+                            with cached[1].open("rb") as f:
+                                st.download_button(
+                                    label="Download Result DXF",
+                                    data=f,
+                                    file_name=done_file,
+                                    mime="application/dxf",
+                                    type="primary",
+                                )
 
-    else:
-        st.info("META file not found for this job yet")
+        else:
+            st.info("META file not found for this job yet")
+
+    # Latest META for the debug panel (rendered outside the fragment)
+    st.session_state["job_meta"] = job_meta
+
+    final = bool(job_meta) and job_meta.get("status") in TERMINAL_STATUSES and not batch_pending
+    if final != st.session_state.get("panel_final", False):
+        st.session_state["panel_final"] = final
+        st.rerun()  # full rerun re-registers the fragment with/without run_every
+    if final and auto_refresh:
+        st.caption("Final state reached; auto-refresh stopped.")
+
+
+job_status_panel()
 
 # ==================================================
 # 🔧 Developer Debug Panel (DEV ONLY)
@@ -753,4 +1205,4 @@ if DEV_MODE:
         })
 
         st.subheader("📦 Job Meta Raw")
-        st.json(job_meta or {})
\ No newline at end of file
+        st.json(st.session_state.get("job_meta") or {})
\ No newline at end of file
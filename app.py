@@ -30,22 +30,33 @@ Notes
 - If Drive upload fails with: "Service Accounts do not have storage quota",
   your target folder is not on a Shared Drive (Workspace) or the SA cannot upload there.
   In that case, the correct fix is to use a Shared Drive.
+- list_jobs() queries jobs ordered by created_at, so RTDB needs the matching
+  .indexOn (otherwise it filters the whole tree). database.rules.fragment.json is
+  only that fragment: merge its "jobs" entry into the project's existing rules
+  (Firebase console -> Realtime Database -> Rules). Do not deploy it as-is:
+  `firebase deploy --only database` replaces the whole rules set, including the
+  existing .read/.write and /workers rules.
 """
 
 from __future__ import annotations
 
 import io
-import time
-import uuid
+import os
+import re
+import tempfile
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from datetime import datetime, timezone, timedelta
-from typing import Any, Dict, List, Optional
+from typing import Any, BinaryIO, Callable, Dict, List, Optional
 
 import streamlit as st
+from streamlit_autorefresh import st_autorefresh
 
 from google.oauth2 import service_account
+from google_auth_httplib2 import AuthorizedHttp
 from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
-from googleapiclient.http import MediaIoBaseUpload, MediaIoBaseDownload
+from googleapiclient.http import MediaIoBaseUpload, MediaIoBaseDownload, build_http
 
 import firebase_admin
 from firebase_admin import credentials, db
@@ -60,6 +71,18 @@ MAX_FILE_MB = 200
 MAX_FILE_BYTES = MAX_FILE_MB * 1024 * 1024
 SEOUL_TZ = timezone(timedelta(hours=9))
 JOBS_PATH = "jobs"  # RTDB root path
+REFRESH_SEC = 5  # auto-refresh interval; also the TTL of cached RTDB reads
+MAX_REFRESH_SEC = 60  # backoff ceiling while a job sits unchanged
+STALE_POLLS_BEFORE_BACKOFF = 5
+TERMINAL_STATUSES = ("done", "error")  # no further worker updates expected
+# Anything but ASCII letters/digits and "-_." is dropped from Drive filenames.
+_UNSAFE_FILENAME_CHARS = re.compile(r"[^A-Za-z0-9._-]")
+RESUMABLE_MIN_BYTES = 5 * 1024 * 1024  # smaller files go up as one multipart POST
+UPLOAD_CHUNK_BYTES = 8 * 1024 * 1024  # resumable chunk size (multiple of 256 KiB)
+DOWNLOAD_CHUNK_BYTES = 16 * 1024 * 1024  # per-request size when streaming results to disk
+DRIVE_HTTP_TIMEOUT_SEC = 60  # per socket operation; large 16 MiB download chunks need headroom
+UPLOAD_WORKERS = 4  # concurrent INBOX uploads per batch (Drive allows ~10 writes/s per user)
+PROGRESS_UPDATE_SEC = 0.2  # upload bar redraw interval while chunks are in flight
 
 
 # -----------------------------
@@ -71,9 +94,9 @@ def now_seoul_iso() -> str:
 
 def make_job_id(original_name: str) -> str:
     ts = datetime.now(SEOUL_TZ).strftime("%Y%m%d_%H%M%S")
-    short = uuid.uuid4().hex[:8]
+    short = os.urandom(4).hex()
     base = (original_name or "file.dxf").replace(" ", "")
-    safe = "".join(c for c in base if c.isascii() and (c.isalnum() or c in ("-", "_", ".")))
+    safe = _UNSAFE_FILENAME_CHARS.sub("", base)
     safe = safe[:60] if safe else "file.dxf"
     if not safe.lower().endswith(".dxf"):
         safe += ".dxf"
@@ -83,6 +106,7 @@ def make_job_id(original_name: str) -> str:
 # -----------------------------
 # Secrets / Clients
 # -----------------------------
+@st.cache_resource(show_spinner=False)  # module-level caches are rebuilt on every rerun
 def _get_sa_info() -> Dict[str, Any]:
     if "gcp_service_account" not in st.secrets:
         raise RuntimeError("Missing [gcp_service_account] in Streamlit Secrets.")
@@ -92,6 +116,7 @@ def _get_sa_info() -> Dict[str, Any]:
     return info
 
 
+@st.cache_resource(show_spinner=False)
 def _get_drive_folder_ids() -> Dict[str, str]:
     if "drive" not in st.secrets:
         raise RuntimeError("Missing [drive] in Streamlit Secrets.")
@@ -103,10 +128,35 @@ def _get_drive_folder_ids() -> Dict[str, str]:
 
 
 @st.cache_resource(show_spinner=False)
-def get_drive_service():
+def get_drive_credentials():
     info = _get_sa_info()
-    creds = service_account.Credentials.from_service_account_info(info, scopes=SCOPES)
-    return build("drive", "v3", credentials=creds, cache_discovery=False)
+    return service_account.Credentials.from_service_account_info(info, scopes=SCOPES)
+
+
+def build_drive_service(creds):
+    # Explicit AuthorizedHttp (rather than build(credentials=...)) so upload threads can
+    # each build their own. build_http() drops 308 from redirect_codes: resumable uploads
+    # answer each chunk with "308 Resume Incomplete" and no Location header.
+    http = build_http()
+    http.timeout = DRIVE_HTTP_TIMEOUT_SEC
+    authed_http = AuthorizedHttp(creds, http=http)
+    return build("drive", "v3", http=authed_http, cache_discovery=False)
+
+
+@st.cache_resource(show_spinner=False)
+def get_drive_service():
+    return build_drive_service(get_drive_credentials())
+
+
+_thread_local = threading.local()
+
+
+def get_thread_drive_service(creds):
+    # httplib2.Http is not thread-safe: each upload thread gets its own client.
+    drive = getattr(_thread_local, "drive", None)
+    if drive is None:
+        drive = _thread_local.drive = build_drive_service(creds)
+    return drive
 
 
 @st.cache_resource(show_spinner=False)
@@ -121,35 +171,74 @@ def init_rtdb():
         firebase_admin.initialize_app(cred, {"databaseURL": st.secrets["rtdb"]["url"].rstrip("/")})
 
 
-def jobs_ref():
-    init_rtdb()
-    return db.reference(JOBS_PATH)
+_jobs_ref: Optional[db.Reference] = None
+
+
+def jobs_ref() -> db.Reference:
+    # Built once per script run; init_rtdb() has already run in the UI preamble by then.
+    global _jobs_ref
+    if _jobs_ref is None:
+        init_rtdb()
+        _jobs_ref = db.reference(JOBS_PATH)
+    return _jobs_ref
 
 
 # -----------------------------
 # Drive operations (minimal)
 # -----------------------------
-def drive_upload_bytes(drive, folder_id: str, filename: str, data: bytes) -> Dict[str, Any]:
-    media = MediaIoBaseUpload(io.BytesIO(data), mimetype="application/dxf", resumable=False)
-    body = {"name": filename, "parents": [folder_id]}
-    return drive.files().create(body=body, media_body=media, fields="id,name,size,createdTime").execute()
-
+def drive_upload_bytes(
+    drive,
+    folder_id: str,
+    filename: str,
+    fileobj: BinaryIO,
+    mime: str = "application/dxf",
+    progress_cb: Optional[Callable[[float], None]] = None,
+) -> Dict[str, Any]:
+    """Upload a seekable file object (e.g. Streamlit's UploadedFile) without copying it."""
+    fileobj.seek(0, io.SEEK_END)
+    size = fileobj.tell()
+    fileobj.seek(0)
 
-def drive_download_bytes(drive, file_id: str) -> bytes:
+    body = {"name": filename, "parents": [folder_id]}
+    fields = "id,name,size,createdTime"
+
+    # Small files: one multipart POST. Large files: resumable, chunked upload.
+    if size < RESUMABLE_MIN_BYTES:
+        media = MediaIoBaseUpload(fileobj, mimetype=mime, resumable=False)
+        return drive.files().create(body=body, media_body=media, fields=fields).execute(num_retries=5)
+
+    media = MediaIoBaseUpload(fileobj, mimetype=mime, chunksize=UPLOAD_CHUNK_BYTES, resumable=True)
+    req = drive.files().create(body=body, media_body=media, fields=fields)
+    response = None
+    while response is None:
+        status, response = req.next_chunk(num_retries=5)
+        if status is not None and progress_cb is not None:
+            progress_cb(status.progress())
+    return response
+
+
+def drive_download(
+    drive,
+    file_id: str,
+    sink: BinaryIO,
+    progress_cb: Optional[Callable[[float], None]] = None,
+) -> None:
+    """Stream a Drive file into `sink` chunk by chunk (no whole-file BytesIO)."""
     req = drive.files().get_media(fileId=file_id)
-    buf = io.BytesIO()
-    downloader = MediaIoBaseDownload(buf, req)
+    downloader = MediaIoBaseDownload(sink, req, chunksize=DOWNLOAD_CHUNK_BYTES)
     done = False
     while not done:
-        _, done = downloader.next_chunk()
-    return buf.getvalue()
+        status, done = downloader.next_chunk(num_retries=3)
+        if status is not None and progress_cb is not None:
+            progress_cb(status.progress())
 
 
 # -----------------------------
 # RTDB job ops (minimal)
 # -----------------------------
-def create_job(job_id: str, original_filename: str, inbox_file_id: str) -> None:
-    payload = {
+def new_job_payload(job_id: str, original_filename: str, inbox_file_id: str) -> Dict[str, Any]:
+    now = now_seoul_iso()
+    return {
         "job_id": job_id,
         "status": "queued",  # queued -> working -> done | error
         "original_filename": original_filename,
@@ -158,21 +247,59 @@ def create_job(job_id: str, original_filename: str, inbox_file_id: str) -> None:
         "result_filename": None,
         "progress": 0,
         "message": "",
-        "created_at": now_seoul_iso(),
-        "updated_at": now_seoul_iso(),
+        "created_at": now,
+        "updated_at": now,
     }
-    jobs_ref().child(job_id).set(payload)
 
 
+def write_jobs(payloads: Dict[str, Dict[str, Any]]) -> None:
+    """Write several jobs with one multi-path update(): all of them land, or none do."""
+    jobs_ref().update(payloads)
+
+
+@st.cache_data(ttl=REFRESH_SEC, show_spinner=False)
 def get_job(job_id: str) -> Optional[Dict[str, Any]]:
     return jobs_ref().child(job_id).get()
 
 
+@st.cache_data(ttl=REFRESH_SEC, show_spinner=False)
 def list_jobs(limit: int = 30) -> List[Dict[str, Any]]:
-    data = jobs_ref().get() or {}
-    jobs = list(data.values())
-    jobs.sort(key=lambda x: x.get("created_at", ""), reverse=True)
-    return jobs[:limit]
+    # Server-side ordered query: only `limit` jobs cross the wire (needs .indexOn created_at).
+    # The result is already ascending by created_at, so newest-first is just a reversal.
+    data = jobs_ref().order_by_child("created_at").limit_to_last(limit).get() or {}
+    return list(data.values())[::-1]
+
+
+def next_poll_sec(job: Optional[Dict[str, Any]]) -> Optional[int]:
+    """Seconds until the next auto-refresh, or None once the job is terminal.
+
+    Polls back off exponentially (up to MAX_REFRESH_SEC) after the job's
+    updated_at has stayed the same for STALE_POLLS_BEFORE_BACKOFF timer ticks.
+    Reruns from user input do not count as polls.
+    """
+    # st_autorefresh's value is its tick counter: it changes only on timer reruns, but
+    # restarts at 1 whenever the component is remounted, so compare with != (not >).
+    ticks = st.session_state.get("job_poll") or 0
+    timer_tick = ticks != st.session_state.get("poll_ticks", 0)
+    st.session_state["poll_ticks"] = ticks
+
+    if not job:
+        return REFRESH_SEC
+    if (job.get("status") or "").lower().strip() in TERMINAL_STATUSES:
+        return None
+
+    seen = (job.get("job_id"), job.get("updated_at"))
+    if st.session_state.get("poll_seen") == seen:
+        if timer_tick:
+            st.session_state["poll_stale"] = st.session_state.get("poll_stale", 0) + 1
+    else:
+        st.session_state["poll_seen"] = seen
+        st.session_state["poll_stale"] = 0
+
+    over = st.session_state["poll_stale"] - STALE_POLLS_BEFORE_BACKOFF
+    if over < 0:
+        return REFRESH_SEC
+    return min(MAX_REFRESH_SEC, REFRESH_SEC * 2 ** (over + 1))
 
 
 # -----------------------------
@@ -198,32 +325,85 @@ except Exception as e:
 
 # ---- Upload ----
 st.subheader("1) Upload DXF → INBOX")
-file = st.file_uploader("DXF 파일 선택", type=["dxf"], accept_multiple_files=False)
+files = st.file_uploader("DXF 파일 선택", type=["dxf"], accept_multiple_files=True)
 
-if file is not None:
-    raw = file.getvalue()
-    if len(raw) > MAX_FILE_BYTES:
-        st.error(f"파일이 너무 큽니다. 최대 {MAX_FILE_MB}MB까지 지원합니다.")
-    else:
-        if st.button("Upload & Create Job", type="primary", use_container_width=True):
+if files:
+    # UploadedFile.size comes from the upload itself; no need to read the bytes.
+    too_big = [f for f in files if f.size > MAX_FILE_BYTES]
+    if too_big:
+        st.error(
+            f"파일이 너무 큽니다. 최대 {MAX_FILE_MB}MB까지 지원합니다:\n- "
+            + "\n- ".join(f.name for f in too_big)
+        )
+    elif st.button("Upload & Create Job", type="primary", use_container_width=True):
+        creds = get_drive_credentials()
+
+        file_progress = [0.0] * len(files)  # per-file fraction, written by the upload threads
+
+        def _upload_one(file, pos):
+            """Upload one DXF to INBOX (runs in a worker thread); the job is written later."""
+
+            def _on_chunk(fraction):
+                file_progress[pos] = fraction
+
+            drive_t = get_thread_drive_service(creds)
             job_id = make_job_id(file.name)
-            drive_filename = f"{job_id}.dxf"
+            created = drive_upload_bytes(drive_t, folders["INBOX"], f"{job_id}.dxf", file, progress_cb=_on_chunk)
+            return job_id, created["id"]
+
+        upload_bar = st.progress(0.0)
+        results = [None] * len(files)  # uploader order, not completion order
+        errors = []
+        with ThreadPoolExecutor(max_workers=min(UPLOAD_WORKERS, len(files))) as executor:
+            futures = {executor.submit(_upload_one, f, pos): pos for pos, f in enumerate(files)}
+            # Streamlit elements are only touched from this (the script) thread; waking
+            # every PROGRESS_UPDATE_SEC lets chunk progress show between completions.
+            pending = set(futures)
+            while pending:
+                done, pending = wait(pending, timeout=PROGRESS_UPDATE_SEC, return_when=FIRST_COMPLETED)
+                for fut in done:
+                    pos = futures[fut]
+                    file_progress[pos] = 1.0
+                    try:
+                        results[pos] = fut.result()
+                    except Exception as e:
+                        errors.append((files[pos].name, e))
+                upload_bar.progress(sum(file_progress) / len(files))
+
+        created_jobs = [r for r in results if r is not None]
+        if created_jobs:
+            # One atomic multi-path update: workers see every job at once, and on failure
+            # none were written, so removing all the INBOX uploads is safe.
             try:
-                created = drive_upload_bytes(drive, folders["INBOX"], drive_filename, raw)
-                inbox_file_id = created["id"]
-                create_job(job_id, file.name, inbox_file_id)
-                st.success("업로드 완료 + RTDB 잡 생성 완료")
-                st.session_state["last_job_id"] = job_id
-                st.code(f"job_id: {job_id}\ninbox_file_id: {inbox_file_id}")
-            except HttpError as he:
-                st.error(f"Drive 업로드 실패: {he}")
-                st.info(
-                    "에러에 'Service Accounts do not have storage quota'가 포함되면,\n"
-                    "현재 폴더가 Shared Drive가 아니거나 서비스계정 업로드가 가능한 구조가 아닙니다.\n"
-                    "정석 해결: Shared Drive(Workspace)로 INBOX/OUTBOX를 옮기고 서비스계정을 멤버로 추가."
-                )
+                write_jobs({
+                    r[0]: new_job_payload(r[0], files[pos].name, r[1])
+                    for pos, r in enumerate(results) if r is not None
+                })
             except Exception as e:
-                st.error(f"업로드/잡 생성 실패: {type(e).__name__}: {e}")
+                # No job record -> no worker will pick the files up; don't leave them in INBOX.
+                for _, fid in created_jobs:
+                    try:
+                        drive.files().delete(fileId=fid).execute()
+                    except Exception:
+                        pass
+                errors.append(("RTDB", e))
+                created_jobs = []
+        if created_jobs:
+            list_jobs.clear()
+            st.success(f"업로드 완료 + RTDB 잡 생성 완료 ({len(created_jobs)}개)")
+            st.session_state["last_job_id"] = created_jobs[0][0]
+            st.code("\n".join(f"job_id: {jid}\ninbox_file_id: {fid}" for jid, fid in created_jobs))
+        for name, e in errors:
+            if isinstance(e, HttpError):
+                st.error(f"Drive 업로드 실패 ({name}): {e}")
+            else:
+                st.error(f"업로드/잡 생성 실패 ({name}): {type(e).__name__}: {e}")
+        if any(isinstance(e, HttpError) for _, e in errors):
+            st.info(
+                "에러에 'Service Accounts do not have storage quota'가 포함되면,\n"
+                "현재 폴더가 Shared Drive가 아니거나 서비스계정 업로드가 가능한 구조가 아닙니다.\n"
+                "정석 해결: Shared Drive(Workspace)로 INBOX/OUTBOX를 옮기고 서비스계정을 멤버로 추가."
+            )
 
 st.divider()
 
@@ -238,7 +418,10 @@ with colA:
         placeholder="20260118_123456_abcd1234_file.dxf",
     )
 with colB:
-    auto_refresh = st.checkbox("자동 새로고침(5초)", value=False)
+    auto_refresh = st.checkbox(f"자동 새로고침({REFRESH_SEC}초)", value=False)
+    if st.button("지금 새로고침", use_container_width=True):
+        list_jobs.clear()
+        get_job.clear()
 
 # Recent jobs selector
 try:
@@ -255,6 +438,7 @@ if recent:
         selected_job_id = pick
 
 # Show selected job
+job = None
 if selected_job_id:
     try:
         job = get_job(selected_job_id)
@@ -277,17 +461,29 @@ if selected_job_id:
             out_name = job.get("result_filename") or f"{selected_job_id}_translated.dxf"
             if out_id:
                 if st.button("Download Result DXF", use_container_width=True):
+                    # Spool to disk while downloading; st.download_button takes a plain
+                    # BufferedReader (open(path, "rb")), not a TemporaryFile.
+                    tmp_path = None
                     try:
-                        data = drive_download_bytes(drive, out_id)
-                        st.download_button(
-                            "Click to save",
-                            data=data,
-                            file_name=out_name,
-                            mime="application/dxf",
-                            use_container_width=True,
-                        )
+                        download_bar = st.progress(0.0)
+                        with tempfile.NamedTemporaryFile(suffix=".dxf", delete=False) as tmp:
+                            tmp_path = tmp.name
+                            drive_download(drive, out_id, tmp, progress_cb=download_bar.progress)
+                        download_bar.empty()
+                        with open(tmp_path, "rb") as f:
+                            st.download_button(
+                                "Click to save",
+                                data=f,
+                                file_name=out_name,
+                                mime="application/dxf",
+                                use_container_width=True,
+                            )
                     except Exception as e:
                         st.error(f"다운로드 실패: {type(e).__name__}: {e}")
+                    finally:
+                        # download_button has already read the file into Streamlit's media store
+                        if tmp_path:
+                            os.unlink(tmp_path)
             else:
                 st.warning("status=done 이지만 outbox_file_id가 없습니다. 워커의 RTDB 업데이트를 확인해 주세요.")
 
@@ -298,5 +494,9 @@ else:
     st.info("job_id를 입력하거나 목록에서 선택하세요.")
 
 if auto_refresh:
-    time.sleep(5)
-    st.rerun()
+    poll_sec = next_poll_sec(job)
+    if poll_sec is None:
+        st.caption("최종 상태입니다. 자동 새로고침을 멈췄습니다.")
+    else:
+        # Browser-side timer: no server thread is held between ticks.
+        st_autorefresh(interval=poll_sec * 1000, key="job_poll")